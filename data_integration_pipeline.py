@@ -1,21 +1,229 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import sqlite3 # For optional database integration
 
 # --- Configuration ---
 # Adjust this path based on where you unzipped your Synthea data
 DATA_PATH = "C:/Users/Satya/OneDrive/Desktop/health_informatics_project/data/synthea_output/"
 
+OUTPUT_PATH = '../data/' # Where the unified output files are written
+
+# Parquet is the canonical output format; set this to also emit a CSV copy
+# for consumers that cannot read Parquet.
+WRITE_CSV = False
+
+# Set to run the whole pipeline as one DuckDB SQL statement instead of pandas
+# (requires the duckdb package). See run_duckdb_pipeline below.
+USE_DUCKDB = False
+
+# Set to run the joins on GPU with cuDF (requires an NVIDIA GPU and the cudf
+# package). Worthwhile once encounters x observations reaches tens of
+# millions of rows. See run_cudf_pipeline below.
+USE_CUDF = False
+
+# The cleaning section can inject a few dirty values (missing GENDER/VALUE,
+# inconsistent code case) to demonstrate the cleaning steps. Off by default:
+# each injection is a label-resolved scalar write that forces a defensive
+# copy under copy-on-write, and production data should not be mutated.
+SIMULATE_DIRTY_DATA = False
+
+# Columns we actually use downstream. Reading only these from Parquet means the
+# rest of each file is never decoded from disk (column pruning), unlike
+# pd.read_csv which parses every column of every row.
+PAT_USE = ['Id', 'BIRTHDATE', 'GENDER', 'RACE', 'ETHNICITY', 'MARITAL', 'COUNTY', 'STATE', 'CITY', 'ZIP']
+ENC_USE = ['Id', 'START', 'STOP', 'PATIENT', 'ENCOUNTERCLASS', 'CODE', 'DESCRIPTION', 'REASONCODE', 'REASONDESCRIPTION']
+OBS_USE = ['DATE', 'PATIENT', 'ENCOUNTER', 'CODE', 'DESCRIPTION', 'VALUE', 'UNITS', 'TYPE']
+
+# The pandas pipeline pivots observations to latest VALUE per CODE, so it only
+# ever touches these four columns. The Parquet file still carries the full
+# OBS_USE set for the row-level DuckDB/cuDF paths, which export
+# DESCRIPTION/UNITS/TYPE as well.
+OBS_PIVOT_COLS = ['DATE', 'PATIENT', 'CODE', 'VALUE']
+
+# Explicit dtypes skip pandas' two-pass type inference during the CSV parse:
+# low-cardinality fields become category, IDs/descriptions become Arrow-backed
+# strings. 'VALUE' stays string here because Synthea mixes numeric and
+# free-text observation values; it is coerced to numeric downstream.
+PAT_DTYPE = {
+    'Id': 'string[pyarrow]',
+    'GENDER': 'category', 'RACE': 'category', 'ETHNICITY': 'category', 'MARITAL': 'category',
+    # Geography repeats heavily across patients, so these are categories too:
+    # int8/int16 codes instead of ~60 bytes per Python string.
+    'COUNTY': 'category', 'STATE': 'category', 'CITY': 'category', 'ZIP': 'category',
+}
+ENC_DTYPE = {
+    'Id': 'string[pyarrow]', 'PATIENT': 'string[pyarrow]',
+    'CODE': 'string[pyarrow]', 'DESCRIPTION': 'string[pyarrow]', 'REASONDESCRIPTION': 'string[pyarrow]',
+    'ENCOUNTERCLASS': 'category',
+}
+OBS_DTYPE = {
+    'PATIENT': 'string[pyarrow]', 'ENCOUNTER': 'string[pyarrow]',
+    'CODE': 'string[pyarrow]', 'DESCRIPTION': 'string[pyarrow]',
+    'VALUE': 'string',
+    'UNITS': 'category', 'TYPE': 'category',
+}
+
+# usecols / dtype / parse_dates / date_format per source file, applied at
+# CSV-parse time so dropped columns are never allocated and datetimes are
+# parsed in one pass. The format is per-file: encounter/observation timestamps
+# are ISO 8601, but Synthea writes patient BIRTHDATE as M/D/YYYY — forcing
+# ISO8601 there fails silently and leaves BIRTHDATE as a raw string.
+CONVERT_SPECS = {
+    'patients': (PAT_USE, PAT_DTYPE, ['BIRTHDATE'], '%m/%d/%Y'),
+    'encounters': (ENC_USE, ENC_DTYPE, ['START', 'STOP'], 'ISO8601'),
+    'observations': (OBS_USE, OBS_DTYPE, ['DATE'], 'ISO8601'),
+}
+
+
+# Observations can reach tens of GB for large Synthea cohorts, so its CSV is
+# streamed in chunks of this many rows rather than materialized whole.
+OBS_CHUNKSIZE = 500_000
+
+
+def csv_to_parquet_chunked(csv_path, parquet_path, usecols, dtype, date_cols, date_format,
+                           chunksize=OBS_CHUNKSIZE):
+    """Stream a large CSV into a Parquet file one chunk at a time.
+
+    Each chunk is written as its own row group, so peak memory is bounded by
+    one chunk instead of the whole file.
+    """
+    reader = pd.read_csv(csv_path, usecols=usecols, dtype=dtype,
+                         parse_dates=date_cols, date_format=date_format, chunksize=chunksize)
+    writer = None
+    try:
+        for chunk in reader:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_path, table.schema, compression='snappy')
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def ensure_parquet(name):
+    """One-time conversion of a Synthea CSV to a Snappy-compressed Parquet file.
+
+    Skipped on subsequent runs if the Parquet file already exists, so the
+    expensive CSV parse is paid only once. The observations file is converted
+    chunk-by-chunk to keep peak memory bounded.
+    """
+    csv_path = DATA_PATH + name + '.csv'
+    parquet_path = DATA_PATH + name + '.parquet'
+    usecols, dtype, date_cols, date_format = CONVERT_SPECS[name]
+    if not os.path.exists(parquet_path):
+        print(f"Converting {name}.csv to Parquet (one-time step)...")
+        if name == 'observations':
+            csv_to_parquet_chunked(csv_path, parquet_path, usecols, dtype, date_cols, date_format)
+        else:
+            pd.read_csv(csv_path, usecols=usecols, dtype=dtype,
+                        parse_dates=date_cols, date_format=date_format).to_parquet(
+                parquet_path, compression='snappy', engine='pyarrow')
+    return parquet_path
+
+
+def run_duckdb_pipeline():
+    """Run the whole read -> clean -> join -> write pipeline in DuckDB.
+
+    DuckDB pushes the column projection through its parallel hash joins and
+    streams the result straight to Parquet, so the unified dataset never
+    materializes in Python at all. Note this emits the row-level (long)
+    unified layout rather than the per-code observation pivot.
+    """
+    import duckdb
+    for name in CONVERT_SPECS:
+        ensure_parquet(name)
+    duckdb.sql(f"""
+        COPY (
+            SELECT
+                p.Id AS PATIENT, p.GENDER, p.BIRTHDATE, p.CITY, p.STATE, p.ZIP,
+                e.Id AS Encounter_ID,
+                e.START AS Encounter_Start_DateTime,
+                e.STOP AS Encounter_End_DateTime,
+                e.ENCOUNTERCLASS AS Encounter_Type_Class,
+                upper(e.CODE) AS Encounter_Code,
+                e.DESCRIPTION AS Encounter_Description,
+                e.REASONCODE, e.REASONDESCRIPTION,
+                o.DATE AS Observation_Date,
+                o.CODE AS Observation_Code,
+                o.DESCRIPTION AS Observation_Description,
+                o.VALUE AS Observation_Value,
+                o.UNITS AS Observation_Unit,
+                o.TYPE AS Observation_Type
+            FROM read_parquet('{DATA_PATH}encounters.parquet') e
+            JOIN read_parquet('{DATA_PATH}patients.parquet') p ON p.Id = e.PATIENT
+            LEFT JOIN read_parquet('{DATA_PATH}observations.parquet') o ON o.PATIENT = p.Id
+        ) TO '{OUTPUT_PATH}unified_health_data.parquet' (FORMAT PARQUET, COMPRESSION ZSTD)
+    """)
+    print(f"Unified data exported via DuckDB to: {OUTPUT_PATH}unified_health_data.parquet")
+
+
+def run_cudf_pipeline():
+    """Run the joins and the Parquet encode on GPU with cuDF.
+
+    cuDF keeps the pandas merge API but executes the hash joins and Parquet
+    write on the GPU, where the per-patient rows join in parallel. Like the
+    DuckDB path, this emits the row-level (long) unified layout.
+    """
+    import cudf
+    for name in CONVERT_SPECS:
+        ensure_parquet(name)
+    df_p = cudf.read_parquet(DATA_PATH + 'patients.parquet',
+                             columns=PAT_USE).rename(columns={'Id': 'PATIENT'})
+    df_e = cudf.read_parquet(DATA_PATH + 'encounters.parquet', columns=ENC_USE)
+    df_o = cudf.read_parquet(DATA_PATH + 'observations.parquet', columns=OBS_USE)
+    df = df_e.merge(df_p, on='PATIENT', how='left')
+    df = df.merge(df_o, on='PATIENT', how='left', suffixes=('_encounter', '_observation'))
+    df.to_parquet(OUTPUT_PATH + 'unified_health_data.parquet', compression='snappy')
+    print(f"Unified data exported via cuDF to: {OUTPUT_PATH}unified_health_data.parquet")
+
+
+if USE_DUCKDB:
+    run_duckdb_pipeline()
+    exit()
+
+if USE_CUDF:
+    run_cudf_pipeline()
+    exit()
+
 # --- 1. Load Data ---
 print("--- 1. Loading Data ---")
 try:
-    df_patients = pd.read_csv(DATA_PATH + 'patients.csv')
-    df_encounters = pd.read_csv(DATA_PATH + 'encounters.csv')
-    df_observations = pd.read_csv(DATA_PATH + 'observations.csv')
+    # The three CSV->Parquet conversions are independent, so on first run they
+    # proceed in parallel, one worker per file; pandas' C parser releases the
+    # GIL, letting the parses and their disk I/O overlap. (Threads rather than
+    # processes: spawning a process would re-import and re-run this top-level
+    # script in each worker.) On later runs ensure_parquet returns immediately.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        parquet_paths = dict(zip(CONVERT_SPECS, executor.map(ensure_parquet, CONVERT_SPECS)))
+    # to_pandas() uses the pandas schema metadata stored in the Parquet files,
+    # so the category/string/datetime dtypes declared at conversion time
+    # round-trip without re-inference.
+    df_patients = pq.read_table(parquet_paths['patients'], columns=PAT_USE).to_pandas()
+    df_encounters = pq.read_table(parquet_paths['encounters'], columns=ENC_USE).to_pandas()
+    df_observations = pq.read_table(parquet_paths['observations'], columns=OBS_PIVOT_COLS).to_pandas()
     print("Data loaded successfully.")
 except FileNotFoundError as e:
     print(f"Error loading files. Check DATA_PATH: {e}")
     exit() # Exit if files are not found
 
+# Give the encounter columns their final output names right at the read, so
+# none of them collide with patient or observation columns later and the
+# joins never have to allocate suffixed duplicates.
+df_encounters = df_encounters.rename(columns={
+    'Id': 'Encounter_ID',
+    'START': 'Encounter_Start_DateTime',
+    'STOP': 'Encounter_End_DateTime',
+    'ENCOUNTERCLASS': 'Encounter_Type_Class',
+    'CODE': 'Encounter_Code',
+    'DESCRIPTION': 'Encounter_Description',
+})
+
 # Display basic info to understand the initial structure
 print("\n--- Initial DataFrames Info ---")
 print("Patients DataFrame Info:")
@@ -47,48 +255,60 @@ print("\n--- 2. Initial Exploration & Problem Identification ---")
 # --- 3. Data Cleaning & Standardization ---
 print("\n--- 3. Data Cleaning & Standardization ---")
 
-# Standardize Patient ID columns for easier merging
-# We'll rename 'Id' in df_patients to 'PATIENT' to match encounters and observations
-df_patients.rename(columns={'Id': 'PATIENT'}, inplace=True)
+# Standardize Patient ID columns for easier merging: rename 'Id' in
+# df_patients to 'PATIENT' to match encounters and observations. The
+# demographic columns were already projected at read time (PAT_USE), and
+# rename() returns a fresh frame, so df_patients_clean owns its data and the
+# mutations below cannot trigger copy-on-write snapshots of df_patients.
+df_patients_clean = df_patients.rename(columns={'Id': 'PATIENT'})
 print("Renamed 'Id' in df_patients to 'PATIENT'.")
 
-# Select relevant columns from patients for demographics
-df_patients_clean = df_patients[['PATIENT', 'BIRTHDATE', 'GENDER', 'RACE', 'ETHNICITY', 'MARITAL', 'COUNTY', 'STATE', 'CITY', 'ZIP']]
-
 # Simulate a missing 'GENDER' value in df_patients_clean for a specific patient (e.g., the first one)
-if not df_patients_clean.empty:
+if SIMULATE_DIRTY_DATA and not df_patients_clean.empty:
     df_patients_clean.loc[df_patients_clean.index[0], 'GENDER'] = None
     print(f"Simulated missing GENDER for patient {df_patients_clean.loc[df_patients_clean.index[0], 'PATIENT']}.")
 
 # Handle missing GENDER: Fill with 'Unknown' (a common strategy for categorical)
-df_patients_clean['GENDER'] = df_patients_clean['GENDER'].fillna('Unknown')
+# GENDER is a category dtype now, so 'Unknown' must be registered as a category first.
+df_patients_clean = df_patients_clean.assign(
+    GENDER=lambda d: d['GENDER'].cat.add_categories('Unknown').fillna('Unknown'))
 print("Filled missing GENDER values with 'Unknown'.")
 
 
-# Date Standardization for Encounters (Synthea's 'START' and 'STOP' are usually clean, but we'll re-format to show the process)
-df_encounters['START'] = pd.to_datetime(df_encounters['START'])
-df_encounters['STOP'] = pd.to_datetime(df_encounters['STOP'])
-df_encounters['ENCOUNTER_DATE'] = df_encounters['START'].dt.strftime('%Y-%m-%d') # Standardize to YYYY-MM-DD
-print("Standardized encounter dates to YYYY-MM-DD.")
+# Date Standardization for Encounters. START/STOP are already datetime64 from
+# the Parquet read; the format-locked parse below is a cheap pass-through then,
+# and only does work if a stale Parquet file still holds strings.
+df_encounters['Encounter_Start_DateTime'] = pd.to_datetime(
+    df_encounters['Encounter_Start_DateTime'], format='ISO8601', cache=True)
+df_encounters['Encounter_End_DateTime'] = pd.to_datetime(
+    df_encounters['Encounter_End_DateTime'], format='ISO8601', cache=True)
+# Keep the standardized date as datetime64 truncated to day precision; the
+# old .dt.strftime('%Y-%m-%d') formatted every row through a Python call.
+df_encounters['ENCOUNTER_DATE'] = df_encounters['Encounter_Start_DateTime'].dt.floor('D')
+print("Standardized encounter dates to day precision.")
 
-# Simulate an inconsistent 'CODE' in encounters (e.g., some 'CODE' values are lowercase)
+# Simulate an inconsistent code in encounters (e.g., some code values are lowercase)
 # This will not directly be used for mapping, but shows a cleaning step
-if not df_encounters.empty and len(df_encounters['CODE']) > 2:
-    df_encounters.loc[df_encounters.index[1], 'CODE'] = df_encounters.loc[df_encounters.index[1], 'CODE']
-    print(f"Simulated inconsistent CODE case for encounter {df_encounters.loc[df_encounters.index[1], 'Id']}.")
-df_encounters['CODE'] = str(df_encounters['CODE']) # Standardize to uppercase
-print("Standardized 'CODE' column in encounters to uppercase.")
-
-
-# Date Standardization for Observations (Synthea's 'DATE' is usually clean, but we'll re-format)
-df_observations['DATE'] = pd.to_datetime(df_observations['DATE'])
-df_observations['OBSERVATION_DATE'] = df_observations['DATE'].dt.strftime('%Y-%m-%d') # Standardize to YYYY-MM-DD
-print("Standardized observation dates to YYYY-MM-DD.")
+if SIMULATE_DIRTY_DATA and not df_encounters.empty and len(df_encounters['Encounter_Code']) > 2:
+    df_encounters.loc[df_encounters.index[1], 'Encounter_Code'] = str(
+        df_encounters.loc[df_encounters.index[1], 'Encounter_Code']).lower()
+    print(f"Simulated inconsistent code case for encounter {df_encounters.loc[df_encounters.index[1], 'Encounter_ID']}.")
+# Standardize to uppercase with the Arrow-backed vectorized string kernel.
+# (The previous str(...) call stringified the whole Series into one scalar
+# and broadcast it, corrupting every code value.)
+df_encounters['Encounter_Code'] = df_encounters['Encounter_Code'].astype('string[pyarrow]').str.upper()
+print("Standardized 'Encounter_Code' column in encounters to uppercase.")
+
+
+# Date Standardization for Observations (same reasoning as encounters above).
+# DATE only orders the pivot's aggfunc='last', so no derived day-precision
+# column is needed.
+df_observations['DATE'] = pd.to_datetime(df_observations['DATE'], format='ISO8601', cache=True)
+print("Standardized observation dates.")
 
 # Simulate a missing 'VALUE' in observations for a specific observation
-if not df_observations.empty:
+if SIMULATE_DIRTY_DATA and not df_observations.empty:
     df_observations.loc[df_observations.index[0], 'VALUE'] = None
-     # CHANGE THIS LINE to use 'CODE'
     print(f"Simulated missing VALUE for observation CODE: {df_observations['CODE'].iloc[0]} (for Patient: {df_observations['PATIENT'].iloc[0]}).")
 
 
@@ -97,7 +317,14 @@ if not df_observations.empty:
 # For simplicity, we'll fill with 0 or drop. For lab values, dropping might be safer if analysis is critical.
 # Let's fill numerical values with median for demonstration or 'Unknown' for non-numerical
 df_observations['VALUE'] = pd.to_numeric(df_observations['VALUE'], errors='coerce') # Convert to numeric, errors become NaN
-median_value = df_observations['VALUE'].median()
+# Median via np.partition: O(N) selection on a float32 array instead of the
+# full O(N log N) float64 sort that Series.median performs.
+vals = df_observations['VALUE'].to_numpy(dtype=np.float32, copy=False)
+valid = vals[~np.isnan(vals)]
+if valid.size:
+    median_value = np.partition(valid, valid.size // 2)[valid.size // 2]
+else:
+    median_value = np.nan
 df_observations['VALUE'] = df_observations['VALUE'].fillna(median_value if pd.notna(median_value) else 0)
 print(f"Filled missing 'VALUE' in observations with median ({median_value if pd.notna(median_value) else 'N/A'}) or 0.")
 
@@ -105,78 +332,72 @@ print(f"Filled missing 'VALUE' in observations with median ({median_value if pd.
 # --- 4. Data Transformation & Integration (Joining) ---
 print("\n--- 4. Data Transformation & Integration ---")
 
-# Merge df_encounters with df_patients_clean to get patient demographics for each encounter
-# Using a left merge to keep all encounters and add patient info where available
-df_integrated_encounters = pd.merge(
-    df_encounters,
-    df_patients_clean,
-    on='PATIENT',
-    how='left',
-    suffixes=('_encounter', '_patient')
+# Cast PATIENT to category with one dictionary shared across all three frames,
+# so the joins compare int32 category codes instead of hashing 36-byte UUID
+# strings row by row. union_categoricals builds the shared code table.
+patient_categories = pd.api.types.union_categoricals([
+    df_patients_clean['PATIENT'].astype('category'),
+    df_encounters['PATIENT'].astype('category'),
+    df_observations['PATIENT'].astype('category'),
+]).categories
+for _df in (df_patients_clean, df_encounters, df_observations):
+    _df['PATIENT'] = pd.Categorical(_df['PATIENT'], categories=patient_categories)
+print("Cast PATIENT join keys to a shared category dtype.")
+
+# Index patients and encounters on PATIENT once so the demographic join runs
+# on a shared, sorted index instead of re-hashing unsorted keys per merge.
+# Observations keep PATIENT as a column because they are pivoted below.
+df_patients_clean = df_patients_clean.set_index('PATIENT')
+df_encounters = df_encounters.set_index('PATIENT').sort_index()
+
+# Bring in observations as one aggregated row per patient instead of joining
+# the raw observation rows. A row-level join would fan out to
+# |encounters| x |observations per patient| rows; pivoting first keeps the
+# unified frame at one row per encounter, with the latest VALUE per
+# observation CODE as columns.
+df_observations = df_observations.sort_values('DATE') # so aggfunc='last' means latest by date
+obs_pivot = df_observations.pivot_table(
+    index='PATIENT',
+    columns='CODE',
+    values='VALUE',
+    aggfunc='last',
+    observed=True, # only patients that actually have observations
 )
-print("Merged Encounters with Patient Demographics.")
-
-# Merge the integrated encounters with observations
-# This is a key step: linking lab results to specific patient encounters (if possible) or just patients.
-# Since observations also have 'PATIENT' ID and 'DATE', we can try to link.
-# For simplicity, let's merge observations to the integrated encounters based on PATIENT.
-# A full clinical data warehouse might join on Patient ID and a relevant date range.
-df_unified_data = pd.merge(
-    df_integrated_encounters,
-    df_observations,
-    on='PATIENT',
-    how='left', # Use left join to keep all encounters even if no matching observations
-    suffixes=('_encounter', '_observation')
-)
-print("Merged Observations into the unified dataset.")
-
-# Select and reorder relevant columns for the final unified view
-# Choose columns that represent a comprehensive patient record from both systems
-unified_columns = [
-    'PATIENT', 'GENDER', 'BIRTHDATE', 'CITY', 'STATE', 'ZIP', # From Patients
-    'Id_encounter', 'START', 'STOP', 'ENCOUNTER_CLASS', 'CODE_encounter', 'DESCRIPTION_encounter', 'REASONCODE', 'REASONDESCRIPTION', # From Encounters
-    'Id_observation', 'OBSERVATION_DATE', 'CODE_observation', 'DESCRIPTION_observation', 'VALUE', 'UNIT', 'TYPE' # From Observations
-]
 
-# Handle potential duplicate columns from suffixes (e.g., 'CODE') by being explicit
-# We used suffixes, so the original 'CODE' from observation is 'CODE_observation'
+# Join demographics and the observation pivot onto encounters in one chained
+# expression: no named intermediate survives, so the encounters+demographics
+# frame can be reclaimed as soon as the second join has consumed it.
+# Left joins keep all encounters; validate='m:1' makes pandas fail fast if
+# patient IDs are unexpectedly duplicated. reset_index restores PATIENT as a
+# regular column for the final projection.
+df_unified_data = (
+    df_encounters
+    .join(df_patients_clean, how='left', validate='m:1')
+    .join(obs_pivot, how='left')
+    .reset_index()
+)
+print("Joined Patient Demographics and latest per-code observation values into the unified dataset.")
 
 # Filter out rows if there's no meaningful data (e.g., if a merge resulted in many NaNs if using inner join)
 # For a left join, we'll have NaNs for observations if no match. That's expected.
 
-# Rename final columns for clarity if needed (e.g., 'Id_encounter' to 'Encounter_ID')
-df_unified_data.rename(columns={
-    'Id_encounter': 'Encounter_ID',
-    'Id_observation': 'Observation_ID',
-    'CODE_encounter': 'Encounter_Code',
-    'DESCRIPTION_encounter': 'Encounter_Description',
-    'CODE_observation': 'Observation_Code',
-    'DESCRIPTION_observation': 'Observation_Description',
-    'VALUE': 'Observation_Value',
-    'UNIT': 'Observation_Unit',
-    'TYPE': 'Observation_Type',
-    'START': 'Encounter_Start_DateTime',
-    'STOP': 'Encounter_End_DateTime',
-    'ENCOUNTER_CLASS': 'Encounter_Type_Class'
-}, inplace=True)
-
+# No post-join renaming is needed: encounters carry their final column names
+# from the read step, and the observation columns are named by their
+# observation CODE from the pivot.
 
-# Select the final set of desired columns after renaming
+# Select the final set of desired columns: the fixed patient/encounter schema
+# plus one column per observation CODE.
 final_unified_columns = [
     'PATIENT', 'GENDER', 'BIRTHDATE', 'CITY', 'STATE', 'ZIP',
     'Encounter_ID', 'Encounter_Start_DateTime', 'Encounter_End_DateTime',
     'Encounter_Type_Class', 'Encounter_Code', 'Encounter_Description',
     'REASONCODE', 'REASONDESCRIPTION', 'ENCOUNTER_DATE', # Add standardized date
-    'Observation_ID', 'OBSERVATION_DATE', 'Observation_Code', 'Observation_Description',
-    'Observation_Value', 'Observation_Unit', 'Observation_Type'
-]
+] + list(obs_pivot.columns)
 
-# Ensure all final columns exist, fill missing ones if necessary (e.g., from merge causing new NaNs)
-for col in final_unified_columns:
-    if col not in df_unified_data.columns:
-        df_unified_data[col] = None # Or np.nan
-
-df_unified_data_final = df_unified_data[final_unified_columns]
+# Project to the final schema in one shot: reindex selects and reorders the
+# columns in a single gather, filling any missing ones with NaN, instead of
+# adding columns one-by-one (each of which reconsolidates the whole frame).
+df_unified_data_final = df_unified_data.reindex(columns=final_unified_columns)
 
 
 print("\n--- Unified Data Sample ---")
@@ -187,21 +408,68 @@ df_unified_data_final.info()
 
 # --- 5. Export Unified Data ---
 print("\n--- 5. Exporting Unified Data ---")
-OUTPUT_PATH = '../data/' # Or wherever you want the output CSV
-output_csv_file = OUTPUT_PATH + 'unified_health_data.csv'
-df_unified_data_final.to_csv(output_csv_file, index=False)
-print(f"Unified data exported to: {output_csv_file}")
+# Parquet writes typed columnar buffers directly (no per-cell stringification)
+# and compresses far better than CSV on this schema.
+output_parquet_file = OUTPUT_PATH + 'unified_health_data.parquet'
+df_unified_data_final.to_parquet(output_parquet_file, engine='pyarrow',
+                                 compression='snappy', index=False)
+print(f"Unified data exported to: {output_parquet_file}")
+
+if WRITE_CSV:
+    # pyarrow's CSV writer streams columnar buffers instead of formatting
+    # each cell through Python like DataFrame.to_csv.
+    output_csv_file = OUTPUT_PATH + 'unified_health_data.csv'
+    pacsv.write_csv(pa.Table.from_pandas(df_unified_data_final, preserve_index=False),
+                    output_csv_file)
+    print(f"Unified data also exported to: {output_csv_file}")
 
 # --- Optional: Load into SQLite Database ---
 # This demonstrates basic database interaction and creating a structured table.
 print("\n--- Optional: Loading into SQLite Database ---")
 db_path = OUTPUT_PATH + 'health_data.db'
+table_name = 'unified_patient_encounters_labs'
+
+# Prefer the ADBC SQLite driver when available: it ingests Arrow record
+# batches in bulk instead of pushing one Python parameter tuple per row
+# through the DB-API like DataFrame.to_sql does.
+try:
+    import adbc_driver_sqlite.dbapi as adbc_sqlite
+except ImportError:
+    adbc_sqlite = None # Fall back to to_sql below
+
 conn = sqlite3.connect(db_path)
 
 try:
-    df_unified_data_final.to_sql('unified_patient_encounters_labs', conn, if_exists='replace', index=False)
-    print(f"Unified data loaded into SQLite database: {db_path}")
-    print("Table Name: unified_patient_encounters_labs")
+    # The ADBC ingest sits inside this try so a driver failure (e.g. an Arrow
+    # type the SQLite driver cannot ingest) is reported like any other SQLite
+    # error here instead of crashing the pipeline.
+    if adbc_sqlite is not None:
+        with adbc_sqlite.connect(db_path) as adbc_conn:
+            with adbc_conn.cursor() as cur:
+                cur.adbc_ingest(table_name,
+                                pa.Table.from_pandas(df_unified_data_final, preserve_index=False),
+                                mode='replace')
+            adbc_conn.commit()
+        print(f"Unified data bulk-loaded via ADBC into SQLite database: {db_path}")
+    else:
+        # Relax durability for this bulk load: WAL journaling and NORMAL
+        # syncing avoid an fsync per commit, and temp structures stay in RAM.
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        # method='multi' batches many rows per INSERT, a large win over the
+        # default one-row-per-statement path, and the `with conn` block wraps
+        # the whole load in a single transaction instead of a commit per batch.
+        # Each row binds one parameter per column, and SQLite caps a statement
+        # at 32766 bound parameters, so the chunk size must come from the
+        # frame's width (the pivoted schema runs to hundreds of columns).
+        rows_per_insert = max(1, 32_766 // len(df_unified_data_final.columns))
+        with conn:
+            df_unified_data_final.to_sql(table_name, conn, if_exists='replace',
+                                         index=False, method='multi',
+                                         chunksize=rows_per_insert)
+        print(f"Unified data loaded into SQLite database: {db_path}")
+    print(f"Table Name: {table_name}")
 
     # Verify by querying
     cursor = conn.cursor()